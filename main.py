@@ -1,6 +1,52 @@
-from src.scraping import run_scraper
-from src.config import BASE_URL, OUTPUT_DIR
+import argparse
+import os
+import socket
+from src.sitemap import run_sitemap_scraper
+from src.sharding import merge_partials, run_worker, seed_queue
+from src.work_queue import SQLiteWorkQueue
+from src.config import (BASE_URL, OUTPUT_DIR, PARTS_DIR, QUEUE_PATH, SHARDS,
+                        SITEMAP_URL)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ecommerce shop scraper")
+    parser.add_argument("command", nargs="?", default="run",
+                        choices=["run", "seed", "worker", "merge"],
+                        help="run a single scraper, or seed/work/merge a "
+                             "sharded crawl")
+    parser.add_argument("--queue", default=QUEUE_PATH,
+                        help="SQLite work queue file")
+    parser.add_argument("--parts", default=PARTS_DIR,
+                        help="directory for per-worker partial outputs")
+    parser.add_argument("--pages", type=int, default=0,
+                        help="listing pages to seed (detected if omitted)")
+    parser.add_argument("--shards", type=int, default=SHARDS,
+                        help="contiguous page ranges to split listing "
+                             "pages into, usually one per worker")
+    parser.add_argument("--worker-id",
+                        default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="unique name for this worker")
+    parser.add_argument("--append", action="store_true",
+                        help="seed into the current run instead of "
+                             "starting a new one")
+    parser.add_argument("--force", action="store_true",
+                        help="merge even if items are still queued")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    run_scraper(BASE_URL, OUTPUT_DIR)
+    args = parse_args()
+    if args.command == "seed":
+        seed_queue(SQLiteWorkQueue(args.queue), SITEMAP_URL, args.pages,
+                   args.parts, fresh=not args.append, shards=args.shards)
+    elif args.command == "worker":
+        run_worker(SQLiteWorkQueue(args.queue), args.worker_id, args.parts)
+    elif args.command == "merge":
+        merge_partials(SQLiteWorkQueue(args.queue), args.parts,
+                       keep_previous=bool(SITEMAP_URL), force=args.force)
+    elif SITEMAP_URL:
+        run_sitemap_scraper(SITEMAP_URL, OUTPUT_DIR)
+    else:
+        # Selenium is only needed for listing pagination
+        from src.scraping import run_scraper
+        run_scraper(BASE_URL, OUTPUT_DIR)
@@ -1,10 +1,27 @@
 import os
 
 # Core settings
-BASE_URL =  # "add link to scrape"
+BASE_URL = ""  # "add link to scrape"
 OUTPUT_DIR = "products"
 CSV_PATH = os.path.join(OUTPUT_DIR, "products.csv")
 
 # Browser options
 HEADLESS = False  # Set to True for production
 WINDOW_SIZE = "1920,1080"
+
+# Sitemap discovery (leave SITEMAP_URL empty to use listing pagination)
+SITEMAP_URL = ""  # e.g. "https://example.com/sitemap.xml"
+PRODUCT_URL_PATTERN = r"/product/[^/?#]+"  # regex a product URL must match
+SITEMAP_STATE_PATH = os.path.join(OUTPUT_DIR, "sitemap_state.json")
+MAX_CONCURRENCY = 8
+REQUEST_TIMEOUT = 30
+USER_AGENT = "Mozilla/5.0 (compatible; webscraper)"
+
+# Sharded crawl (python main.py seed | worker | merge)
+QUEUE_PATH = os.path.join(OUTPUT_DIR, "queue.sqlite3")
+PARTS_DIR = os.path.join(OUTPUT_DIR, "parts")
+LEASE_SECONDS = 300  # a claimed item is handed out again after this long
+MAX_ATTEMPTS = 3
+POLL_INTERVAL = 5
+SHARDS = 4  # listing pages are split into this many contiguous ranges
+PAGE_URL_TEMPLATE = ""  # e.g. "https://example.com/shop?page={page}"
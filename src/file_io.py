@@ -6,7 +6,7 @@ from .config import CSV_PATH, OUTPUT_DIR
 
 def save_to_csv(products: List[Dict], csv_path: str) -> bool:
     """Save products to CSV with proper file handling"""
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(csv_path) or OUTPUT_DIR, exist_ok=True)
     try:
         with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
             if products:
@@ -25,3 +25,15 @@ def save_to_csv(products: List[Dict], csv_path: str) -> bool:
     except Exception as e:
         print(f"Error saving to CSV: {e}")
         return False
+
+
+def load_from_csv(csv_path: str) -> List[Dict]:
+    """Load previously saved products, returning an empty list if none"""
+    if not os.path.exists(csv_path):
+        return []
+    try:
+        with open(csv_path, newline='', encoding='utf-8') as csvfile:
+            return list(csv.DictReader(csvfile))
+    except Exception as e:
+        print(f"Error reading {csv_path}: {e}")
+        return []
@@ -3,6 +3,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
+from typing import List
 
 
 def get_total_pages(driver: WebDriver) -> int:
@@ -75,3 +76,18 @@ def navigate_to_page(driver: WebDriver, page_number: int) -> bool:
     except Exception as e:
         print(f"Error navigating to page {page_number}: {e}")
         return False
+
+
+def get_visible_pages(driver: WebDriver) -> List[int]:
+    """Page numbers of the pagination buttons currently rendered"""
+    pages = []
+    try:
+        for button in driver.find_elements(
+                By.CSS_SELECTOR, "button[data-qa^='button-']"):
+            page_num_str = (button.get_attribute("data-qa") or "").replace(
+                "button-", "")
+            if page_num_str.isdigit():
+                pages.append(int(page_num_str))
+    except Exception as e:
+        print(f"Error reading pagination buttons: {e}")
+    return pages
@@ -26,6 +26,15 @@ def scrape_products(driver: webdriver.Chrome) -> List[Dict]:
     return products
 
 
+def load_lazy_content(driver: webdriver.Chrome):
+    """Scroll through the page so lazily loaded products are rendered"""
+    driver.execute_script(
+        "window.scrollTo(0, document.body.scrollHeight);")
+    time.sleep(2)
+    driver.execute_script("window.scrollTo(0, 0);")
+    time.sleep(1)
+
+
 def run_scraper(base_url: str, output_dir: str):
     driver = init_driver()
     try:
@@ -49,11 +58,7 @@ def run_scraper(base_url: str, output_dir: str):
                 print(f"Could not navigate to page {page_num}. Stopping.")
                 break
 
-            driver.execute_script(
-                "window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
+            load_lazy_content(driver)
 
             page_products = scrape_products(driver)
             if page_products:
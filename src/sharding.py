@@ -0,0 +1,305 @@
+import csv
+import glob
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from .config import (BASE_URL, CSV_PATH, LEASE_SECONDS, PAGE_URL_TEMPLATE,
+                     PARTS_DIR, POLL_INTERVAL, SHARDS, SITEMAP_STATE_PATH)
+from .file_io import load_from_csv, save_to_csv
+from .sitemap import (PRODUCT_FIELDS, discover_product_urls, fetch_product,
+                      load_state, save_state, select_changed)
+from .work_queue import WorkQueue
+
+SEEDED_URLS_FILE = "seeded_urls.json"
+
+
+def clear_partials(parts_dir: str = PARTS_DIR):
+    """Delete partial outputs and the URL manifest left by a previous run"""
+    paths = glob.glob(os.path.join(parts_dir, "*.csv"))
+    paths.append(os.path.join(parts_dir, SEEDED_URLS_FILE))
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def load_seeded_urls(parts_dir: str = PARTS_DIR) -> Optional[Set[str]]:
+    """URLs the current sitemap run covers, or None if none were recorded"""
+    path = os.path.join(parts_dir, SEEDED_URLS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return set(json.load(f))
+
+
+def _save_seeded_urls(urls: Set[str], parts_dir: str):
+    os.makedirs(parts_dir, exist_ok=True)
+    with open(os.path.join(parts_dir, SEEDED_URLS_FILE), 'w',
+              encoding='utf-8') as f:
+        json.dump(sorted(urls), f, indent=2)
+
+
+def page_ranges(total_pages: int, shards: int) -> List[Tuple[int, int]]:
+    """Split pages 1..total_pages into at most shards contiguous ranges"""
+    shards = max(1, min(shards, total_pages))
+    size, extra = divmod(total_pages, shards)
+    ranges = []
+    start = 1
+    for i in range(shards):
+        end = start + size - 1 + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def seed_queue(queue: WorkQueue, sitemap_url: str = "", total_pages: int = 0,
+               parts_dir: str = PARTS_DIR, fresh: bool = True,
+               shards: int = SHARDS) -> int:
+    """Fill the queue with product URLs from a sitemap, or listing pages.
+
+    Listing pages are queued as one contiguous range per shard, so each
+    worker walks its own stretch of the pagination instead of clicking
+    through the pages other workers took.
+
+    A fresh seed empties the queue and the partial outputs first, so each
+    run starts clean. Otherwise items are added to the running crawl.
+    """
+    if fresh:
+        queue.reset()
+        clear_partials(parts_dir)
+
+    if sitemap_url:
+        discovered, complete = discover_product_urls(sitemap_url)
+        changed = select_changed(discovered, load_state(SITEMAP_STATE_PATH))
+        items = [('url', url, discovered[url]) for url in changed]
+
+        # Record every product the run covers, so merge can drop products
+        # that left the sitemap while keeping unchanged ones
+        seeded = set(discovered)
+        if not complete:
+            previous = {row.get('URL') for row in load_from_csv(CSV_PATH)}
+            print("Some sitemaps could not be read, keeping previously "
+                  "scraped products not seen this run")
+            seeded |= {url for url in previous if url}
+        if not fresh:
+            seeded |= load_seeded_urls(parts_dir) or set()
+        _save_seeded_urls(seeded, parts_dir)
+    else:
+        if not total_pages:
+            total_pages = _detect_total_pages()
+        items = [('page', f"{start}-{end}", "")
+                 for start, end in page_ranges(total_pages, shards)]
+
+    added = queue.put(items)
+    print(f"Queued {added} new items ({len(items)} seeded)")
+    return added
+
+
+def _detect_total_pages() -> int:
+    from .scraping import init_driver
+    from .navigation import get_total_pages
+
+    driver = init_driver()
+    try:
+        driver.get(BASE_URL)
+        time.sleep(5)
+        return get_total_pages(driver)
+    finally:
+        driver.quit()
+
+
+def append_partial(products: List[Dict], part_path: str) -> bool:
+    """Append products to this worker's partial CSV as soon as they exist"""
+    os.makedirs(os.path.dirname(part_path) or ".", exist_ok=True)
+    try:
+        is_new = not os.path.exists(part_path)
+        with open(part_path, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=PRODUCT_FIELDS,
+                                    restval='', extrasaction='ignore')
+            if is_new:
+                writer.writeheader()
+            writer.writerows(products)
+        return True
+    except Exception as e:
+        print(f"Error writing partial output {part_path}: {e}")
+        return False
+
+
+class _PageScraper:
+    """Lazily started browser for "page" range items.
+
+    Pagination usually only renders buttons for nearby pages, so without
+    PAGE_URL_TEMPLATE the browser stays on its last page and moves forward
+    by clicking the furthest rendered button that does not overshoot.
+    """
+
+    def __init__(self):
+        self.driver = None
+        self.current_page = None
+
+    def _go_to(self, page_number: int) -> bool:
+        from .navigation import get_visible_pages, navigate_to_page
+
+        if PAGE_URL_TEMPLATE:
+            self.driver.get(PAGE_URL_TEMPLATE.format(page=page_number))
+            time.sleep(5)
+            self.current_page = page_number
+            return True
+
+        if self.current_page is None or page_number < self.current_page:
+            self.driver.get(BASE_URL)
+            time.sleep(5)
+            self.current_page = 1
+
+        while self.current_page < page_number:
+            reachable = [page for page in get_visible_pages(self.driver)
+                         if self.current_page < page <= page_number]
+            step = max(reachable) if reachable else self.current_page + 1
+            if not navigate_to_page(self.driver, step):
+                self.current_page = None
+                return False
+            self.current_page = step
+        return True
+
+    def scrape(self, start: int, end: int) -> Optional[List[Dict]]:
+        from .scraping import init_driver, load_lazy_content, scrape_products
+
+        if self.driver is None:
+            self.driver = init_driver()
+        products = []
+        for page_number in range(start, end + 1):
+            if not self._go_to(page_number):
+                return None
+            load_lazy_content(self.driver)
+            products.extend(scrape_products(self.driver))
+        return products
+
+    def close(self):
+        if self.driver is not None:
+            self.driver.quit()
+
+
+def _renew_lease(queue: WorkQueue, item: Dict, worker_id: str,
+                 lease_seconds: float, stop: threading.Event):
+    """Keep extending an item's lease until stop is set"""
+    while not stop.wait(lease_seconds / 3):
+        if not queue.extend(item, worker_id, lease_seconds):
+            print(f"[{worker_id}] Lost lease on {item['value']}")
+            return
+
+
+def run_worker(queue: WorkQueue, worker_id: str, parts_dir: str = PARTS_DIR,
+               lease_seconds: float = LEASE_SECONDS,
+               poll_interval: float = POLL_INTERVAL) -> int:
+    """Claim and process items until the queue is drained"""
+    part_path = os.path.join(parts_dir, f"{worker_id}.csv")
+    pages = _PageScraper()
+    processed = 0
+    try:
+        while True:
+            item = queue.claim(worker_id, lease_seconds)
+            if item is None:
+                # Other workers may still die and release their leases
+                if queue.remaining() == 0:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            print(f"[{worker_id}] Processing {item['kind']} {item['value']}")
+            stop = threading.Event()
+            keeper = threading.Thread(
+                target=_renew_lease, daemon=True,
+                args=(queue, item, worker_id, lease_seconds, stop))
+            keeper.start()
+            try:
+                if item['kind'] == 'url':
+                    # A page that is not a product still gets a row with
+                    # only URL and Lastmod, so merge records its lastmod
+                    product = fetch_product(item['value']) or {
+                        'URL': item['value']}
+                    product['Lastmod'] = item['extra']
+                    products = [product]
+                else:
+                    start, end = item['value'].split('-')
+                    products = pages.scrape(int(start), int(end))
+            except Exception as e:
+                print(f"[{worker_id}] Error processing {item['value']}: {e}")
+                products = None
+            finally:
+                stop.set()
+                keeper.join()
+
+            if products is None or not append_partial(products, part_path):
+                queue.fail(item, worker_id)
+                continue
+            queue.complete(item, worker_id)
+            processed += 1
+    finally:
+        pages.close()
+
+    print(f"[{worker_id}] Done, processed {processed} items")
+    return processed
+
+
+def _product_key(product: Dict):
+    # Listing rows have no URL; only drop rows that are identical, so
+    # variants sharing a name and price are kept
+    return product.get('URL') or (product.get('Name'), product.get('Price'),
+                                  product.get('Description'),
+                                  product.get('Image_URL'))
+
+
+def merge_partials(queue: WorkQueue, parts_dir: str = PARTS_DIR,
+                   csv_path: str = CSV_PATH, keep_previous: bool = False,
+                   force: bool = False) -> Optional[List[Dict]]:
+    """Combine worker outputs into one deduplicated CSV.
+
+    Refuses to run while the queue still has work unless force is set.
+    With keep_previous, rows already in csv_path are kept unless a worker
+    produced a newer version, which is what incremental sitemap runs need;
+    products no longer in the seeded sitemap are dropped.
+    """
+    remaining = queue.remaining()
+    if remaining:
+        print(f"{remaining} items are still queued or in progress")
+        if not force:
+            print("Not merging; wait for the workers or use --force")
+            return None
+
+    failed = queue.failed()
+    if failed:
+        print(f"Warning: {len(failed)} items failed and are missing "
+              f"from this run:")
+        for item in failed:
+            print(f"  {item['kind']} {item['value']}")
+
+    merged = {}
+    if keep_previous:
+        for product in load_from_csv(csv_path):
+            merged[_product_key(product)] = product
+
+    part_paths = sorted(glob.glob(os.path.join(parts_dir, "*.csv")))
+    for part_path in part_paths:
+        for product in load_from_csv(part_path):
+            merged[_product_key(product)] = product
+
+    if keep_previous:
+        seeded = load_seeded_urls(parts_dir)
+        if seeded is None:
+            print("Warning: no seeded URL list found, keeping all products")
+        else:
+            merged = {key: product for key, product in merged.items()
+                      if product.get('URL') in seeded}
+
+    rows = [{field: product.get(field, "") for field in PRODUCT_FIELDS}
+            for product in merged.values()]
+    # Rows without a name mark pages that turned out not to be products
+    all_products = [row for row in rows if row['Name']]
+    if save_to_csv(all_products, csv_path):
+        print(f"Merged {len(part_paths)} partial files into "
+              f"{len(all_products)} products at {csv_path}")
+        if keep_previous:
+            save_state({row['URL']: row['Lastmod'] for row in rows
+                        if row['URL'] and row['Lastmod']}, SITEMAP_STATE_PATH)
+    return all_products
@@ -0,0 +1,301 @@
+import gzip
+import io
+import json
+import os
+import re
+import time
+import urllib.request
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+from bs4 import BeautifulSoup
+from .config import (CSV_PATH, MAX_CONCURRENCY, PRODUCT_URL_PATTERN,
+                     REQUEST_TIMEOUT, SITEMAP_STATE_PATH, USER_AGENT)
+from .file_io import load_from_csv, save_to_csv
+
+GZIP_MAGIC = b"\x1f\x8b"
+PRODUCT_FIELDS = ['Name', 'Price', 'Description', 'Image_URL', 'URL', 'Lastmod']
+
+
+def open_url(url: str):
+    """Open a URL as a streaming binary file, transparently un-gzipping it"""
+    request = urllib.request.Request(url, headers={
+        'User-Agent': USER_AGENT,
+        'Accept-Encoding': 'gzip',
+    })
+    response = urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT)
+    stream = io.BufferedReader(response)
+    # Both .xml.gz files and gzip transfer encoding start with the magic bytes
+    if stream.peek(2)[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+XHTML_NS = "{http://www.w3.org/1999/xhtml}"
+ENTRY_TAGS = ('url', 'sitemap', 'item', 'entry')
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag name"""
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+def iter_sitemap_entries(source) -> Iterator[Tuple[str, str, str]]:
+    """Stream (kind, loc, lastmod) tuples out of a sitemap, index or feed.
+
+    kind is "sitemap" for entries of a sitemap index and "url" for pages.
+    RSS items and Atom entries are reported as "url" entries too, so a
+    product feed can be used in place of a sitemap.
+    """
+    loc, link, lastmod = "", "", ""
+    open_elements = []
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        name = _local_name(elem.tag)
+        if event == 'start':
+            open_elements.append(elem)
+            if name in ENTRY_TAGS:
+                loc, link, lastmod = "", "", ""
+            continue
+
+        open_elements.pop()
+        # Only the entry's own loc/link count; image:loc and friends are
+        # nested one level deeper, and feed-level links sit outside entries
+        in_entry = bool(open_elements) and _local_name(
+            open_elements[-1].tag) in ENTRY_TAGS
+        if name == 'loc' and in_entry:
+            loc = (elem.text or "").strip()
+        elif (name == 'link' and in_entry and not link
+              and not elem.tag.startswith(XHTML_NS)):
+            # xhtml:link holds hreflang alternates; Atom links keep the URL
+            # in href, and only the alternate (default) link is the page
+            if elem.get('href') is None:
+                link = (elem.text or "").strip()
+            elif elem.get('rel', 'alternate') == 'alternate':
+                link = elem.get('href').strip()
+        elif name in ('lastmod', 'updated', 'pubdate'):
+            lastmod = (elem.text or "").strip()
+        elif name in ENTRY_TAGS:
+            if loc or link:
+                kind = 'sitemap' if name == 'sitemap' else 'url'
+                yield kind, loc or link, lastmod
+            # Drop finished entries from their parent so memory does not
+            # grow with the number of entries in huge sitemaps
+            if open_elements:
+                open_elements[-1].clear()
+
+
+def discover_product_urls(sitemap_url: str, pattern: str = PRODUCT_URL_PATTERN
+                          ) -> Tuple[Dict[str, str], bool]:
+    """Collect product URLs and lastmod dates, following sitemap indexes.
+
+    Also returns whether every sitemap was read; if not, the URL list is
+    missing whatever the failed sitemaps contained.
+    """
+    product_re = re.compile(pattern) if pattern else None
+    products = {}
+    complete = True
+    pending = [sitemap_url]
+    seen = set()
+
+    while pending:
+        url = pending.pop()
+        if url in seen:
+            continue
+        seen.add(url)
+
+        print(f"Reading sitemap: {url}")
+        try:
+            with open_url(url) as stream:
+                for kind, loc, lastmod in iter_sitemap_entries(stream):
+                    if kind == 'sitemap':
+                        pending.append(loc)
+                    elif product_re is None or product_re.search(loc):
+                        products[loc] = lastmod
+        except Exception as e:
+            print(f"Error reading sitemap {url}: {e}")
+            complete = False
+
+    print(f"Discovered {len(products)} product URLs")
+    return products, complete
+
+
+def load_state(state_path: str) -> Dict[str, str]:
+    """Load the lastmod dates recorded by the previous run"""
+    if not os.path.exists(state_path):
+        return {}
+    try:
+        with open(state_path, encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading {state_path}: {e}")
+        return {}
+
+
+def save_state(state: Dict[str, str], state_path: str) -> bool:
+    """Persist lastmod dates so the next run can skip unchanged products"""
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    try:
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, state_path)
+        return True
+    except Exception as e:
+        print(f"Error saving state to {state_path}: {e}")
+        return False
+
+
+def select_changed(discovered: Dict[str, str],
+                   state: Dict[str, str]) -> List[str]:
+    """Return URLs that are new, changed, or have no lastmod to compare"""
+    return [url for url, lastmod in discovered.items()
+            if not lastmod or state.get(url) != lastmod]
+
+
+def _first_text(soup: BeautifulSoup, selectors: List[str]) -> Optional[str]:
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if element:
+            text = element.get('content') or element.get_text(strip=True)
+            if text:
+                return text.strip()
+    return None
+
+
+def parse_product_page(html: str, url: str) -> Optional[Dict]:
+    """Extract a product from its own page, preferring meta tags"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    name = _first_text(soup, [
+        'meta[property="og:title"]',
+        '.product-title',
+        '.product-name',
+        'h1',
+    ])
+    price = _first_text(soup, [
+        'meta[property="product:price:amount"]',
+        'meta[property="og:price:amount"]',
+        '[itemprop="price"]',
+        '.product-price',
+        '.price',
+        '[class*="price"]',
+    ])
+    description = _first_text(soup, [
+        'meta[property="og:description"]',
+        'meta[name="description"]',
+        '.product-description',
+        '.description',
+    ])
+    image_url = _first_text(soup, [
+        'meta[property="og:image"]',
+        'meta[itemprop="image"]',
+    ])
+    if not image_url:
+        # Only images inside product markup; the first <img> is the logo
+        img_element = soup.select_one(
+            'img[itemprop="image"], .product img, [class*="product"] img')
+        if img_element:
+            image_url = img_element.get(
+                'src', '') or img_element.get('data-src', '')
+
+    # Listing and category pages share the URL prefix, so insist on a
+    # price or explicit product markup before calling it a product
+    og_type = soup.select_one('meta[property="og:type"]')
+    is_product = (og_type is not None and og_type.get(
+        'content', '').lower() in ('product', 'og:product')) or bool(
+        soup.select_one('[itemtype*="schema.org/Product"]'))
+    if not (price or is_product):
+        return None
+    return {
+        'Name': name or url,
+        'Price': price or "Price not found",
+        'Description': description or "",
+        'Image_URL': image_url or "",
+        'URL': url,
+    }
+
+
+def fetch_product(url: str) -> Optional[Dict]:
+    """Download and parse a single product page.
+
+    Returns None for pages that are not products; download errors raise,
+    so callers can retry them instead of treating them as non-products.
+    """
+    with open_url(url) as stream:
+        html = stream.read().decode('utf-8', errors='replace')
+    return parse_product_page(html, url)
+
+
+def fetch_products(urls: List[str], max_workers: int = MAX_CONCURRENCY
+                   ) -> Dict[str, Optional[Dict]]:
+    """Fetch product pages with at most max_workers requests in flight.
+
+    Pages that are not products map to None; failed downloads are left
+    out so they are retried next run.
+    """
+    results = {}
+    if not urls:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_product, url): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                product = future.result()
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")
+                continue
+            results[url] = product
+            if product:
+                print(f"Successfully scraped: {product['Name']}")
+            else:
+                print(f"Skipped {url} - not a product page")
+    return results
+
+
+def run_sitemap_scraper(sitemap_url: str, output_dir: str):
+    """Scrape products listed in a sitemap, refetching only changed ones"""
+    start = time.time()
+    discovered, complete = discover_product_urls(sitemap_url)
+    previous = {row.get('URL'): row for row in load_from_csv(CSV_PATH)}
+    # Without the previous CSV there is nothing to carry over, so start over
+    state = load_state(SITEMAP_STATE_PATH) if previous else {}
+    changed = select_changed(discovered, state)
+    print(f"{len(changed)} of {len(discovered)} products changed since last run")
+
+    fetched = fetch_products(changed)
+
+    # Carry over unchanged products from the previous CSV
+    all_products = []
+    for url, lastmod in discovered.items():
+        product = fetched[url] if url in fetched else previous.get(url)
+        if not product:
+            continue
+        product = {field: product.get(field, "") for field in PRODUCT_FIELDS}
+        if url in fetched:
+            product['Lastmod'] = lastmod
+        all_products.append(product)
+
+    # A sitemap that failed to download says nothing about its products,
+    # so keep what the last run found rather than dropping them
+    missing = []
+    if not complete:
+        missing = [url for url in previous if url and url not in discovered]
+        print(f"Some sitemaps could not be read, keeping {len(missing)} "
+              f"previously scraped products not seen this run")
+        for url in missing:
+            all_products.append({field: previous[url].get(field, "")
+                                 for field in PRODUCT_FIELDS})
+
+    if save_to_csv(all_products, CSV_PATH):
+        print(f"\nSuccessfully saved {len(all_products)} products to {CSV_PATH}")
+        # Record lastmod for every page we fetched or that is unchanged,
+        # including non-product pages; failed downloads are retried
+        new_state = {url: lastmod for url, lastmod in discovered.items()
+                     if lastmod and (url in fetched or
+                                     state.get(url) == lastmod)}
+        new_state.update({url: state[url] for url in missing if url in state})
+        save_state(new_state, SITEMAP_STATE_PATH)
+
+    print(f"Finished in {time.time() - start:.1f}s")
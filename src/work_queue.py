@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+from .config import LEASE_SECONDS, MAX_ATTEMPTS
+
+
+class WorkQueue(ABC):
+    """Interface shared by all work queue backends.
+
+    Items are dicts with 'id', 'kind' ("page" or "url"), 'value', 'extra'
+    and 'attempts'. A claimed item is leased to one worker; if the worker
+    does not complete it before the lease expires, it is handed out again.
+    Implement this class to plug in a network broker for multi-host crawls.
+    Methods may be called from a worker's lease-renewal thread.
+    """
+
+    @abstractmethod
+    def reset(self):
+        """Remove every item, so a new run starts from an empty queue"""
+
+    @abstractmethod
+    def put(self, items: Iterable[Tuple[str, str, str]]) -> int:
+        """Add (kind, value, extra) items, returning how many were queued.
+
+        An item already in the queue is only queued again when its extra
+        value changed, e.g. a product URL with a newer lastmod.
+        """
+
+    @abstractmethod
+    def claim(self, worker_id: str,
+              lease_seconds: float = LEASE_SECONDS) -> Optional[Dict]:
+        """Lease the next available item to worker_id, or return None"""
+
+    @abstractmethod
+    def extend(self, item: Dict, worker_id: str,
+               lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Renew the lease on an item still being processed"""
+
+    @abstractmethod
+    def complete(self, item: Dict, worker_id: str) -> bool:
+        """Mark an item as done"""
+
+    @abstractmethod
+    def fail(self, item: Dict, worker_id: str) -> bool:
+        """Release an item for retry, or give up after MAX_ATTEMPTS"""
+
+    @abstractmethod
+    def remaining(self) -> int:
+        """Number of items not yet done or permanently failed"""
+
+    @abstractmethod
+    def failed(self) -> List[Dict]:
+        """Items that used up all their attempts"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Work queue stored in a SQLite file.
+
+    Safe for several processes on one host. SQLite locking is unreliable on
+    network filesystems, so use a broker-backed WorkQueue across hosts.
+    """
+
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+        # Shared with the worker's lease-renewal thread, guarded by lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                extra TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (kind, value)
+            )""")
+
+    def close(self):
+        self.conn.close()
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self.lock:
+            return self.conn.execute(sql, params)
+
+    def reset(self):
+        self._execute("DELETE FROM items")
+
+    def put(self, items: Iterable[Tuple[str, str, str]]) -> int:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.executemany(
+                    "INSERT INTO items (kind, value, extra) VALUES (?, ?, ?) "
+                    "ON CONFLICT (kind, value) DO UPDATE SET "
+                    "extra = excluded.extra, status = 'pending', "
+                    "worker = NULL, lease_until = 0, attempts = 0 "
+                    "WHERE extra != excluded.extra", items)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+    def claim(self, worker_id: str,
+              lease_seconds: float = LEASE_SECONDS) -> Optional[Dict]:
+        now = time.time()
+        with self.lock:
+            # BEGIN IMMEDIATE takes the write lock, so two workers never
+            # select the same row
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT * FROM items WHERE attempts < ? AND ("
+                    "status = 'pending' OR "
+                    "(status = 'claimed' AND lease_until < ?)) "
+                    "ORDER BY id LIMIT 1",
+                    (self.max_attempts, now)).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                self.conn.execute(
+                    "UPDATE items SET status = 'claimed', worker = ?, "
+                    "lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker_id, now + lease_seconds, row['id']))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'value': row['value'],
+            'extra': row['extra'],
+            'attempts': row['attempts'] + 1,
+        }
+
+    def extend(self, item: Dict, worker_id: str,
+               lease_seconds: float = LEASE_SECONDS) -> bool:
+        cursor = self._execute(
+            "UPDATE items SET lease_until = ? "
+            "WHERE id = ? AND worker = ? AND status = 'claimed'",
+            (time.time() + lease_seconds, item['id'], worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, item: Dict, worker_id: str) -> bool:
+        # Completing is allowed even after the lease moved to another
+        # worker: the work is done, and the merge step drops duplicates.
+        # The extra check keeps an item re-queued with newer data pending.
+        cursor = self._execute(
+            "UPDATE items SET status = 'done', worker = ? "
+            "WHERE id = ? AND extra = ?",
+            (worker_id, item['id'], item['extra']))
+        return cursor.rowcount == 1
+
+    def fail(self, item: Dict, worker_id: str) -> bool:
+        cursor = self._execute(
+            "UPDATE items SET status = CASE WHEN attempts >= ? "
+            "THEN 'failed' ELSE 'pending' END, lease_until = 0 "
+            "WHERE id = ? AND worker = ? AND status = 'claimed'",
+            (self.max_attempts, item['id'], worker_id))
+        return cursor.rowcount == 1
+
+    def remaining(self) -> int:
+        # Expired leases that used up their attempts can never be claimed
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM items WHERE status = 'pending' OR "
+                "(status = 'claimed' AND (attempts < ? OR lease_until >= ?))",
+                (self.max_attempts, time.time())).fetchone()[0]
+
+    def failed(self) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM items WHERE status = 'failed' OR "
+                "(status = 'claimed' AND attempts >= ? AND lease_until < ?) "
+                "ORDER BY id", (self.max_attempts, time.time())).fetchall()
+        return [{
+            'id': row['id'],
+            'kind': row['kind'],
+            'value': row['value'],
+            'extra': row['extra'],
+            'attempts': row['attempts'],
+        } for row in rows]
@@ -0,0 +1,180 @@
+"""Sitemap and feed parsing, fed from in-memory bytes.
+
+Run from the repository root with: python -m pytest tests
+"""
+import gzip
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("bs4")
+
+from src import sitemap  # noqa: E402
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:xhtml="http://www.w3.org/1999/xhtml"
+        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+  <url>
+    <xhtml:link rel="alternate" hreflang="fr" href="https://s/fr/product/foo"/>
+    <loc>https://s/product/foo</loc>
+    <lastmod>2024-01-01</lastmod>
+    <image:image><image:loc>https://cdn/foo.jpg</image:loc></image:image>
+  </url>
+  <url><loc>https://s/about</loc></url>
+</urlset>"""
+
+INDEX = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://s/products.xml.gz</loc><lastmod>2024-03-01</lastmod></sitemap>
+  <sitemap><loc>https://s/pages.xml</loc></sitemap>
+</sitemapindex>"""
+
+RSS = b"""<rss version="2.0"><channel>
+  <link>https://s/</link>
+  <item><link>https://s/product/bar</link><pubDate>Mon, 01 Jan 2024</pubDate></item>
+</channel></rss>"""
+
+ATOM = b"""<feed xmlns="http://www.w3.org/2005/Atom">
+  <link rel="self" href="https://s/feed.atom"/>
+  <entry>
+    <link rel="enclosure" href="https://cdn/baz.jpg"/>
+    <link rel="self" href="https://s/feed/baz"/>
+    <link rel="alternate" href="https://s/product/baz"/>
+    <updated>2024-02-01</updated>
+  </entry>
+</feed>"""
+
+PRODUCT_PAGE = """<html><head>
+<meta property="og:type" content="product">
+<meta property="og:title" content="Hat">
+<meta property="product:price:amount" content="10.00">
+</head><body><img src="logo.png"><h1>Hat</h1></body></html>"""
+
+LISTING_PAGE = """<html><head><meta property="og:title" content="Shop">
+</head><body><img src="logo.png"><h1>All products</h1></body></html>"""
+
+
+def entries(data):
+    return list(sitemap.iter_sitemap_entries(io.BytesIO(data)))
+
+
+def test_urlset_ignores_alternates_and_images():
+    assert entries(URLSET) == [
+        ('url', 'https://s/product/foo', '2024-01-01'),
+        ('url', 'https://s/about', ''),
+    ]
+
+
+def test_sitemap_index():
+    assert entries(INDEX) == [
+        ('sitemap', 'https://s/products.xml.gz', '2024-03-01'),
+        ('sitemap', 'https://s/pages.xml', ''),
+    ]
+
+
+def test_rss_feed():
+    assert entries(RSS) == [
+        ('url', 'https://s/product/bar', 'Mon, 01 Jan 2024')]
+
+
+def test_atom_feed_takes_alternate_link():
+    assert entries(ATOM) == [('url', 'https://s/product/baz', '2024-02-01')]
+
+
+def serve(monkeypatch, pages):
+    """Answer open_url from a dict of URL -> bytes, failing on others"""
+    def open_url(url):
+        if url not in pages:
+            raise OSError(f"cannot reach {url}")
+        data = pages[url]
+        if data[:2] == sitemap.GZIP_MAGIC:
+            return gzip.GzipFile(fileobj=io.BytesIO(data))
+        return io.BytesIO(data)
+    monkeypatch.setattr(sitemap, "open_url", open_url)
+
+
+def test_discover_follows_index_and_gzip(monkeypatch):
+    serve(monkeypatch, {
+        'https://s/sitemap.xml': INDEX,
+        'https://s/products.xml.gz': gzip.compress(URLSET),
+        'https://s/pages.xml': RSS,
+    })
+    discovered, complete = sitemap.discover_product_urls(
+        'https://s/sitemap.xml', r"/product/[^/?#]+")
+    assert complete
+    assert discovered == {
+        'https://s/product/foo': '2024-01-01',
+        'https://s/product/bar': 'Mon, 01 Jan 2024',
+    }
+
+
+def test_select_changed():
+    discovered = {'a': '1', 'b': '2', 'c': '', 'd': '1'}
+    state = {'a': '1', 'b': '1', 'c': ''}
+    assert sitemap.select_changed(discovered, state) == ['b', 'c', 'd']
+
+
+def test_parse_product_page_rejects_listing_pages():
+    assert sitemap.parse_product_page(LISTING_PAGE, 'https://s/product/x') \
+        is None
+    product = sitemap.parse_product_page(PRODUCT_PAGE, 'https://s/product/h')
+    assert product['Name'] == 'Hat'
+    assert product['Price'] == '10.00'
+    assert product['Image_URL'] == ''
+
+
+def test_failed_sitemap_keeps_previous_rows(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "products.csv")
+    state_path = str(tmp_path / "state.json")
+    monkeypatch.setattr(sitemap, "CSV_PATH", csv_path)
+    monkeypatch.setattr(sitemap, "SITEMAP_STATE_PATH", state_path)
+
+    previous = [{'Name': name, 'Price': '1', 'Description': '',
+                 'Image_URL': '', 'URL': f'https://s/product/{name}',
+                 'Lastmod': '2024-01-01'} for name in ('foo', 'bar')]
+    sitemap.save_to_csv(previous, csv_path)
+    sitemap.save_state({p['URL']: p['Lastmod'] for p in previous}, state_path)
+
+    # products.xml.gz lists foo; pages.xml (which would list bar) is down
+    serve(monkeypatch, {
+        'https://s/sitemap.xml': INDEX,
+        'https://s/products.xml.gz': gzip.compress(URLSET),
+    })
+    sitemap.run_sitemap_scraper('https://s/sitemap.xml', str(tmp_path))
+
+    rows = sitemap.load_from_csv(csv_path)
+    assert sorted(row['URL'] for row in rows) == [
+        'https://s/product/bar', 'https://s/product/foo']
+    assert sitemap.load_state(state_path) == {
+        'https://s/product/bar': '2024-01-01',
+        'https://s/product/foo': '2024-01-01',
+    }
+
+
+def test_non_product_pages_are_not_refetched(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "products.csv")
+    state_path = str(tmp_path / "state.json")
+    monkeypatch.setattr(sitemap, "CSV_PATH", csv_path)
+    monkeypatch.setattr(sitemap, "SITEMAP_STATE_PATH", state_path)
+
+    feed = b"""<urlset>
+      <url><loc>https://s/product/hat</loc><lastmod>1</lastmod></url>
+      <url><loc>https://s/product/all</loc><lastmod>1</lastmod></url>
+    </urlset>"""
+    pages = {'https://s/sitemap.xml': feed,
+             'https://s/product/hat': PRODUCT_PAGE.encode(),
+             'https://s/product/all': LISTING_PAGE.encode()}
+    serve(monkeypatch, pages)
+    sitemap.run_sitemap_scraper('https://s/sitemap.xml', str(tmp_path))
+    assert [row['Name'] for row in sitemap.load_from_csv(csv_path)] == ['Hat']
+
+    # Second run: nothing changed, so no page may be downloaded again
+    fetched = []
+    monkeypatch.setattr(sitemap, "fetch_product", fetched.append)
+    sitemap.run_sitemap_scraper('https://s/sitemap.xml', str(tmp_path))
+    assert fetched == []
+    assert [row['Name'] for row in sitemap.load_from_csv(csv_path)] == ['Hat']
@@ -0,0 +1,291 @@
+"""Multi-process checks for the sharded crawl queue.
+
+Run from the repository root with: python -m pytest tests
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.work_queue import SQLiteWorkQueue, WorkQueue  # noqa: E402
+
+# Workers must share the parent's patched modules, so always fork
+mp = multiprocessing.get_context("fork")
+
+
+def _claim_all(queue_path, worker_id):
+    queue = SQLiteWorkQueue(queue_path)
+    claimed = []
+    while True:
+        item = queue.claim(worker_id)
+        if item is None:
+            return claimed
+        claimed.append(item['id'])
+        queue.complete(item, worker_id)
+
+
+def _fake_fetch_product(url):
+    return {'Name': url.rsplit('/', 1)[-1], 'Price': '1', 'URL': url}
+
+
+def _slow_fetch_product(url):
+    time.sleep(1)
+    return _fake_fetch_product(url)
+
+
+def _run_worker(queue_path, parts_dir, worker_id, slow=False):
+    from src import sharding
+    sharding.fetch_product = _slow_fetch_product if slow else \
+        _fake_fetch_product
+    return sharding.run_worker(SQLiteWorkQueue(queue_path), worker_id,
+                               parts_dir, lease_seconds=0.3,
+                               poll_interval=0.1)
+
+
+def test_incomplete_backend_fails_on_construction():
+    class HalfQueue(WorkQueue):
+        def claim(self, worker_id, lease_seconds=0):
+            return None
+
+    with pytest.raises(TypeError):
+        HalfQueue()
+
+
+def test_claims_are_exclusive_across_processes(tmp_path):
+    queue_path = str(tmp_path / "queue.sqlite3")
+    queue = SQLiteWorkQueue(queue_path)
+    assert queue.put([('url', f"u{i}", "") for i in range(300)]) == 300
+
+    with mp.Pool(6) as pool:
+        results = pool.starmap(
+            _claim_all, [(queue_path, f"w{i}") for i in range(6)])
+
+    claimed = [item_id for ids in results for item_id in ids]
+    assert len(claimed) == 300
+    assert len(set(claimed)) == 300
+    assert queue.remaining() == 0
+
+
+def test_expired_lease_is_reissued(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"))
+    queue.put([('page', "1", "")])
+
+    item = queue.claim("dead", lease_seconds=0.1)
+    assert queue.claim("other") is None
+    time.sleep(0.2)
+
+    reissued = queue.claim("other")
+    assert reissued['id'] == item['id']
+    assert reissued['attempts'] == 2
+
+
+def test_extend_keeps_lease(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"))
+    queue.put([('page', "1", "")])
+
+    item = queue.claim("slow", lease_seconds=0.1)
+    assert queue.extend(item, "slow", lease_seconds=10)
+    time.sleep(0.2)
+    assert queue.claim("other") is None
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2)
+    queue.put([('page', "1", "")])
+
+    for _ in range(2):
+        item = queue.claim("w")
+        assert queue.fail(item, "w")
+
+    assert queue.claim("w") is None
+    assert queue.remaining() == 0
+    assert [item['value'] for item in queue.failed()] == ["1"]
+
+
+def test_reseed_requeues_changed_items(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"))
+    queue.put([('url', "http://x/product/a", "2024-01-01")])
+    queue.complete(queue.claim("w"), "w")
+
+    # Same lastmod: nothing to do
+    assert queue.put([('url', "http://x/product/a", "2024-01-01")]) == 0
+    assert queue.claim("w") is None
+
+    # Newer lastmod: queued again with a fresh attempt count
+    assert queue.put([('url', "http://x/product/a", "2024-02-01")]) == 1
+    item = queue.claim("w")
+    assert item['extra'] == "2024-02-01"
+    assert item['attempts'] == 1
+
+    queue.reset()
+    assert queue.remaining() == 0
+    assert queue.put([('url', "http://x/product/a", "2024-02-01")]) == 1
+
+
+def test_workers_and_merge(tmp_path):
+    pytest.importorskip("bs4")
+    from src.sharding import merge_partials
+
+    queue_path = str(tmp_path / "queue.sqlite3")
+    parts_dir = str(tmp_path / "parts")
+    csv_path = str(tmp_path / "products.csv")
+    queue = SQLiteWorkQueue(queue_path)
+    queue.put([('url', f"http://x/product/{i}", "1") for i in range(100)])
+
+    # A worker that dies holding a lease; its item must be reissued
+    queue.claim("dead", lease_seconds=0.3)
+    assert merge_partials(queue, parts_dir, csv_path) is None
+
+    with mp.Pool(4) as pool:
+        counts = pool.starmap(
+            _run_worker, [(queue_path, parts_dir, f"w{i}") for i in range(4)])
+
+    assert sum(counts) == 100
+    products = merge_partials(queue, parts_dir, csv_path)
+    assert len(products) == 100
+    assert len({product['URL'] for product in products}) == 100
+
+
+def test_worker_renews_lease_on_slow_items(tmp_path):
+    pytest.importorskip("bs4")
+    queue_path = str(tmp_path / "queue.sqlite3")
+    parts_dir = str(tmp_path / "parts")
+    queue = SQLiteWorkQueue(queue_path)
+    queue.put([('url', f"http://x/product/{i}", "1") for i in range(2)])
+
+    # Each fetch outlives the lease several times over; without renewal
+    # the idle worker would pick the same item up again
+    with mp.Pool(3) as pool:
+        counts = pool.starmap(
+            _run_worker,
+            [(queue_path, parts_dir, f"w{i}", True) for i in range(3)])
+
+    assert sum(counts) == 2
+
+
+def test_merge_drops_products_no_longer_seeded(tmp_path, monkeypatch):
+    pytest.importorskip("bs4")
+    from src import sharding
+
+    monkeypatch.setattr(sharding, "SITEMAP_STATE_PATH",
+                        str(tmp_path / "state.json"))
+    parts_dir = str(tmp_path / "parts")
+    csv_path = str(tmp_path / "products.csv")
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"))
+
+    # Last run had a and b; b has since left the sitemap and c is new
+    sharding.save_to_csv([_fake_fetch_product("http://x/product/a"),
+                          _fake_fetch_product("http://x/product/b")],
+                         csv_path)
+    sharding._save_seeded_urls({"http://x/product/a", "http://x/product/c"},
+                               parts_dir)
+    sharding.append_partial([_fake_fetch_product("http://x/product/c")],
+                            os.path.join(parts_dir, "w0.csv"))
+
+    products = sharding.merge_partials(queue, parts_dir, csv_path,
+                                       keep_previous=True)
+    assert sorted(p['URL'] for p in products) == [
+        "http://x/product/a", "http://x/product/c"]
+
+
+def test_page_ranges_are_contiguous():
+    from src.sharding import page_ranges
+
+    assert page_ranges(10, 3) == [(1, 4), (5, 7), (8, 10)]
+    assert page_ranges(2, 4) == [(1, 1), (2, 2)]
+
+
+class _FakeDriver:
+    """Pagination that renders buttons for two pages either side"""
+
+    def __init__(self):
+        self.page = None
+        self.clicks = []
+
+    def get(self, url):
+        self.page = 1
+
+
+def test_page_scraper_jumps_through_visible_buttons(monkeypatch):
+    pytest.importorskip("bs4")
+    import types
+    from src import sharding
+
+    driver = _FakeDriver()
+    navigation = types.ModuleType("src.navigation")
+    navigation.get_visible_pages = lambda d: list(
+        range(max(1, d.page - 2), d.page + 3))
+
+    def navigate_to_page(d, page):
+        d.clicks.append(page)
+        d.page = page
+        return True
+    navigation.navigate_to_page = navigate_to_page
+    scraping = types.ModuleType("src.scraping")
+    scraping.init_driver = lambda: driver
+    scraping.load_lazy_content = lambda d: None
+    scraping.scrape_products = lambda d: [{'Name': f"p{d.page}"}]
+    monkeypatch.setitem(sys.modules, "src.navigation", navigation)
+    monkeypatch.setitem(sys.modules, "src.scraping", scraping)
+    monkeypatch.setattr(sharding.time, "sleep", lambda seconds: None)
+
+    products = sharding._PageScraper().scrape(7, 9)
+    assert [p['Name'] for p in products] == ["p7", "p8", "p9"]
+    assert driver.clicks == [3, 5, 7, 8, 9]
+
+
+def _fetch_or_fail(url):
+    if url.endswith("down"):
+        raise OSError("timed out")
+    if url.endswith("listing"):
+        return None
+    return _fake_fetch_product(url)
+
+
+def test_non_products_complete_and_errors_fail(tmp_path, monkeypatch):
+    pytest.importorskip("bs4")
+    from src import sharding
+
+    monkeypatch.setattr(sharding, "fetch_product", _fetch_or_fail)
+    monkeypatch.setattr(sharding, "SITEMAP_STATE_PATH",
+                        str(tmp_path / "state.json"))
+    parts_dir = str(tmp_path / "parts")
+    csv_path = str(tmp_path / "products.csv")
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"), max_attempts=1)
+    queue.put([('url', f"http://x/product/{name}", "1")
+               for name in ("hat", "listing", "down")])
+    sharding._save_seeded_urls(
+        {f"http://x/product/{name}" for name in ("hat", "listing", "down")},
+        parts_dir)
+
+    sharding.run_worker(queue, "w0", parts_dir, poll_interval=0.1)
+    assert [item['value'] for item in queue.failed()] == [
+        "http://x/product/down"]
+
+    products = sharding.merge_partials(queue, parts_dir, csv_path,
+                                       keep_previous=True)
+    assert [p['URL'] for p in products] == ["http://x/product/hat"]
+    # The non-product page is remembered so it is not fetched again
+    assert sharding.load_state(sharding.SITEMAP_STATE_PATH) == {
+        "http://x/product/hat": "1", "http://x/product/listing": "1"}
+
+
+def test_merge_keeps_listing_variants(tmp_path):
+    pytest.importorskip("bs4")
+    from src import sharding
+
+    parts_dir = str(tmp_path / "parts")
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"))
+    red = {'Name': "Tee", 'Price': "10", 'Image_URL': "red.jpg"}
+    blue = {'Name': "Tee", 'Price': "10", 'Image_URL': "blue.jpg"}
+    sharding.append_partial([red, blue], os.path.join(parts_dir, "w0.csv"))
+    # A retried page range writes the same rows again
+    sharding.append_partial([red], os.path.join(parts_dir, "w1.csv"))
+
+    products = sharding.merge_partials(queue, parts_dir,
+                                       str(tmp_path / "products.csv"))
+    assert sorted(p['Image_URL'] for p in products) == ["blue.jpg", "red.jpg"]